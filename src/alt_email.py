@@ -1,7 +1,9 @@
 from typing import IO
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import AuthBase
+from urllib3.util.retry import Retry
 
 
 class EmailHeaderAuth(AuthBase):
@@ -17,6 +19,14 @@ class EmailApi:
         self.url = url
         self.session = requests.Session()
         self.session.auth = auth
+        # only retry failed connections, a POST that reached the server may have
+        # already sent the email
+        adapter = HTTPAdapter(max_retries=Retry(connect=3, read=0, status=0, backoff_factor=0.5))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def close(self):
+        self.session.close()
 
     def email(self,
               to: str,
@@ -1,12 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable
+
 from prtg import ApiClient, Icon
 from prtg.exception import ObjectNotFound
 
 from .models import Device, Group, Node, Status
 
+# map API values to enums, built once instead of an Enum lookup per object
+STATUS_BY_VALUE = {status.value: status for status in Status}
+ICON_BY_VALUE = {icon.value: icon for icon in Icon}
+
+
+def _get_status(status: str) -> Status:
+    """Helper function to get a Status from the API value. Unknown values still
+    raise ValueError from the Enum lookup."""
+    status = status.lower()
+    return STATUS_BY_VALUE.get(status) or Status(status)
+
 
 class PrtgController:
-    def __init__(self, client: ApiClient):
+    def __init__(self, client: ApiClient, max_workers: int = 8):
         self.client = client
+        self.max_workers = max_workers
+        # map {id: dict} of group and probe payloads, reused by get_parent() and
+        # get_tree(). Entries are dropped when objects are moved or deleted.
+        self._group_cache = {}
+
+    def _run_concurrently(self, calls: list[Callable]):
+        """Helper function to run independent client calls concurrently. Waits for all
+        calls to finish before raising the first exception, if any. A single call is
+        run inline instead of starting a thread pool."""
+        if len(calls) <= 1:
+            for call in calls:
+                call()
+            return
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(call) for call in calls]
+        for future in futures:
+            future.result()
 
     def get_probe(self, probe_id: int | str) -> Group:
         """Probes will be treated the same as groups"""
@@ -38,7 +70,30 @@ class PrtgController:
     def _get_group(self, group: dict) -> Group:
         """Helper function to create a Group from a dict payload returned by the API"""
         tags = set(group['tags'].split())
-        return Group(group['objid'], group['name'], int(group['priority']), tags, group['location'], Status(group['status'].lower()), group['active'])
+        return Group(group['objid'], group['name'], int(group['priority']), tags, group['location'], _get_status(group['status']), group['active'])
+
+    def _get_group_dict(self, group_id: int | str) -> dict:
+        """Helper function to get a group's dict payload from the API, which could also be a probe.
+        Payloads are cached since ancestor groups are looked up repeatedly."""
+        group_id = int(group_id)
+        try:
+            return self._group_cache[group_id]
+        except KeyError:
+            pass
+        try:
+            group = self.client.get_group(group_id)
+        except ObjectNotFound:
+            group = self.client.get_probe(group_id)
+        self._group_cache[group_id] = group
+        return group
+
+    def invalidate_group(self, group_id: int | str):
+        """Remove a group from the cache, e.g. after it has been changed outside of this controller
+
+        Args:
+            group_id (int | str): id of group
+        """
+        self._group_cache.pop(int(group_id), None)
 
     def get_group(self, group_id: int | str) -> Group:
         """Get group by id
@@ -100,15 +155,18 @@ class PrtgController:
             raise ValueError(f'Group "{parent.name}" is missing required attribute id.')
         new_group = self.client.add_group(group.name, parent.id)
         group_id = new_group['objid']
+        # remaining properties are independent of each other, set them concurrently
+        calls = []
         if group.is_active:
-            self.client.resume_object(group_id)
+            calls.append(partial(self.client.resume_object, group_id))
         else:
-            self.client.pause_object(group_id)
-        self.client.set_priority(group_id, group.priority)
+            calls.append(partial(self.client.pause_object, group_id))
+        calls.append(partial(self.client.set_priority, group_id, group.priority))
         if group.tags:
-            self.client.set_tags(group_id, list(group.tags))
+            calls.append(partial(self.client.set_tags, group_id, list(group.tags)))
         if group.location:
-            self.client.set_location(group_id, group.location)
+            calls.append(partial(self.client.set_location, group_id, group.location))
+        self._run_concurrently(calls)
         return Group(group_id, group.name, group.priority, group.tags, group.location, group.status, group.is_active)
 
     def get_groups(self, parent: Group | None = None) -> list[Group]:
@@ -131,6 +189,27 @@ class PrtgController:
             groups = self.client.get_groups_by_group_id(parent.id)
         return [self._get_group(group) for group in groups]
 
+    def is_empty(self, group: Group) -> bool:
+        """Check if a group has no groups or devices. Cheaper than get_groups() and
+        get_devices() since payloads are not converted (no service URL requests) and
+        devices are only queried when there are no groups.
+
+        Args:
+            group (Group): group to check
+
+        Raises:
+            ValueError: when group is missing ID field
+
+        Returns:
+            bool
+        """
+        if group.id is None:
+            raise ValueError(f'Group {group.name} is missing required attribute id.')
+        # the response may include the group itself, which is not a child
+        if any(sub_group['objid'] != group.id for sub_group in self.client.get_groups_by_group_id(group.id)):
+            return False
+        return not self.client.get_devices_by_group_id(group.id)
+
     def get_groups_by_name(self, name: str, parent: Group | None = None) -> list[Group]:
         """Get groups with name, optionally filtered by a parent group
 
@@ -153,16 +232,23 @@ class PrtgController:
         groups = self.client.get_groups_by_name_containing(name, parent_id)
         return [self._get_group(group) for group in groups]
 
-    def _get_device(self, device: dict) -> Device:
+    def _get_device(self, device: dict, service_url: str | None = None) -> Device:
         """Helper function to create a Device from a dict payload returned by the API"""
         tags = set(device['tags'].split())
-        try:
-            icon = Icon(device['icon'])
-        except ValueError:
-            icon = None
-        service_url = self.client.get_service_url(device['objid'])
+        # icons not in Icon, e.g. custom icons, default to None
+        icon = ICON_BY_VALUE.get(device['icon'])
+        if service_url is None:
+            service_url = self.client.get_service_url(device['objid'])
         return Device(device['objid'], device['name'], device['host'], service_url, int(device['priority']), tags, device['location'], icon,
-                      Status(device['status'].lower()), device['active'])
+                      _get_status(device['status']), device['active'])
+
+    def _get_devices(self, devices: list[dict]) -> list[Device]:
+        """Helper function to create Devices from dict payloads returned by the API. The
+        service URL is not part of the payload and requires a request per device, so
+        they are fetched concurrently."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            service_urls = executor.map(self.client.get_service_url, [device['objid'] for device in devices])
+            return [self._get_device(device, service_url) for device, service_url in zip(devices, service_urls)]
 
     def get_device(self, device_id: int | str) -> Device:
         """Get a device by its id
@@ -196,17 +282,20 @@ class PrtgController:
         else:
             new_device = self.client.add_device(device.name, device.host, parent.id)
         device_id = new_device['objid']
+        # remaining properties are independent of each other, set them concurrently
+        calls = []
         if device.service_url:
-            self.client.set_service_url(device_id, device.service_url)
+            calls.append(partial(self.client.set_service_url, device_id, device.service_url))
         if device.is_active:
-            self.client.resume_object(device_id)
+            calls.append(partial(self.client.resume_object, device_id))
         else:
-            self.client.pause_object(device_id)
-        self.client.set_priority(device_id, device.priority)
+            calls.append(partial(self.client.pause_object, device_id))
+        calls.append(partial(self.client.set_priority, device_id, device.priority))
         if device.tags:
-            self.client.set_tags(device_id, list(device.tags))
+            calls.append(partial(self.client.set_tags, device_id, list(device.tags)))
         if device.location:
-            self.client.set_location(device_id, device.location)
+            calls.append(partial(self.client.set_location, device_id, device.location))
+        self._run_concurrently(calls)
         return Device(device_id, device.name, device.host, device.service_url, device.priority, device.tags, device.location, device.icon, device.status,
                       device.is_active)
 
@@ -228,32 +317,37 @@ class PrtgController:
             if parent.id is None:
                 raise ValueError(f'Group "{parent.name}" is missing required attribute id.')
             devices = self.client.get_devices_by_group_id(parent.id)
-        return [self._get_device(device) for device in devices]
+        return self._get_devices(devices)
 
-    def update_device(self, device: Device):
+    def update_device(self, device: Device, current_device: Device | None = None):
         """Update a device
 
         Args:
             device (Device): device with updated fields
+            current_device (Device | None, optional): current state of device, if already fetched. Defaults to None.
 
         Raises:
             ValueError: when device is missing ID field
         """
         if device.id is None:
             raise ValueError(f'Cannot update device, ID is missing for device {device.name}')
-        current_device = self.get_device(device.id)
+        if current_device is None:
+            current_device = self.get_device(device.id)
+        # only update mismatched fields, each independent of each other
+        calls = []
         if device.name != current_device.name:
-            self.client.rename_object(device.id, device.name)
+            calls.append(partial(self.client.rename_object, device.id, device.name))
         if device.host != current_device.host:
-            self.client.set_hostname(device.id, device.host)
+            calls.append(partial(self.client.set_hostname, device.id, device.host))
         if device.service_url != current_device.service_url:
-            self.client.set_service_url(device.id, device.service_url)
+            calls.append(partial(self.client.set_service_url, device.id, device.service_url))
         if device.priority != current_device.priority:
-            self.client.set_priority(device.id, device.priority)
+            calls.append(partial(self.client.set_priority, device.id, device.priority))
         if device.tags != current_device.tags:
-            self.client.set_tags(device.id, list(device.tags))
+            calls.append(partial(self.client.set_tags, device.id, list(device.tags)))
         if device.icon and device.icon != current_device.icon:
-            self.client.set_icon(device.id, device.icon)
+            calls.append(partial(self.client.set_icon, device.id, device.icon))
+        self._run_concurrently(calls)
 
     def get_parent(self, obj: Device | Group) -> Group:
         """Get object's parent
@@ -272,18 +366,12 @@ class PrtgController:
         if isinstance(obj, Device):
             obj_dict = self.client.get_device(obj.id)
         elif isinstance(obj, Group):
-            try:
-                obj_dict = self.client.get_group(obj.id)
-            except ObjectNotFound:
-                # object could be a probe
-                obj_dict = self.client.get_probe(obj.id)
+            # object could be a probe
+            obj_dict = self._get_group_dict(obj.id)
         else:
             raise ValueError(f'Unsupported type {type(obj)}')
-        try:
-            group = self.client.get_group(obj_dict['parentid'])
-        except ObjectNotFound:
-            # parent could be a probe
-            group = self.client.get_probe(obj_dict['parentid'])
+        # parent could be a probe
+        group = self._get_group_dict(obj_dict['parentid'])
         return self._get_group(group)
 
     def move_object(self, obj: Device | Group, parent: Group):
@@ -301,6 +389,7 @@ class PrtgController:
         if parent.id is None:
             raise ValueError(f'Cannot move to group, group ID is missing for group {parent.name}')
         self.client.move_object(obj.id, parent.id)
+        self.invalidate_group(obj.id)
 
     def delete_object(self, obj: Device | Group):
         """Delete an object
@@ -314,6 +403,7 @@ class PrtgController:
         if obj.id is None:
             raise ValueError(f'Cannot delete object, object ID is missing for object {obj.name}')
         self.client.delete_object(obj.id)
+        self.invalidate_group(obj.id)
 
     def get_tree(self, group: Group) -> Node:
         """Create a tree model of a group in PRTG. There exists a get_sensortree() endpoint
@@ -341,35 +431,41 @@ class PrtgController:
         # will use client methods but will take advantage of the 'parentid'
         # attribute.
 
-        # Get all devices in root group.
-        devices = self.client.get_devices_by_group_id(group.id)
+        # Get all devices in root group, ignoring probe devices.
+        devices = [device_dict for device_dict in self.client.get_devices_by_group_id(group.id)
+                   if device_dict['name'] != 'Probe Device']
+
+        # Get groups in root group with a single request, mapped {id: dict}. The
+        # response may include the root group itself, which is already a node.
+        group_dicts = {group_dict['objid']: group_dict for group_dict in self.client.get_groups_by_group_id(group.id)
+                       if group_dict['objid'] != group.id}
+        self._group_cache.update(group_dicts)
+
+        # Get remaining ancestor groups of devices not returned above, if any, one
+        # level at a time. Each level is fetched concurrently and shared ancestors
+        # are only fetched once.
+        parent_ids = {device_dict['parentid'] for device_dict in devices} - group_map.keys() - group_dicts.keys()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while parent_ids:
+                level = dict(zip(parent_ids, executor.map(self._get_group_dict, parent_ids)))
+                group_dicts.update(level)
+                parent_ids = {sub_group_dict['parentid'] for sub_group_dict in level.values()} - group_map.keys() - group_dicts.keys()
 
         # Build tree backward from leaf nodes, i.e. devices
-        for device_dict in devices:
-            # ignore probe devices
-            if device_dict['name'] == 'Probe Device':
-                continue
-            device = self._get_device(device_dict)
+        for device_dict, device in zip(devices, self._get_devices(devices)):
             nodes_to_create = [device]  # ordered list of nodes to create later
             curr_parent_id = device_dict['parentid']
             # Loop through parent groups using 'parentid' until existing Node is reached,
             # whether that's the root node or a previously created one
-            while True:
-                try:
-                    existing_node = group_map[curr_parent_id]
-                except KeyError:
-                    # Node does not exist. Add new group to list of nodes to create
-                    # and update current parent ID.
-                    try:
-                        sub_group_dict = self.client.get_group(curr_parent_id)   # Get group details
-                    except ObjectNotFound:
-                        # Probe group
-                        sub_group_dict = self.client.get_probe(curr_parent_id)
-                    sub_group = self._get_group(sub_group_dict)
-                    nodes_to_create.append(sub_group)
-                    curr_parent_id = sub_group_dict['parentid']
-                    continue
-                break
+            existing_node = group_map.get(curr_parent_id)
+            while existing_node is None:
+                # Node does not exist. Add new group to list of nodes to create
+                # and update current parent ID.
+                sub_group_dict = group_dicts[curr_parent_id]
+                sub_group = self._get_group(sub_group_dict)
+                nodes_to_create.append(sub_group)
+                curr_parent_id = sub_group_dict['parentid']
+                existing_node = group_map.get(curr_parent_id)
             # Create tree path downward, starting with existing node as parent
             for prtg_obj in reversed(nodes_to_create):
                 new_node = Node(prtg_obj, parent=existing_node)
@@ -4,6 +4,9 @@ import logging.handlers
 import os
 import secrets
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
 from pathlib import PurePath
 from tempfile import SpooledTemporaryFile
 
@@ -40,6 +43,8 @@ if SYSLOG_HOST:
     SYSLOG_PORT = int(os.getenv('SYSLOG_PORT', 514))
 TOKEN = os.environ['TOKEN']
 MIN_DEVICES = int(os.environ['PRTG_MIN_DEVICES'])
+# number of sites to fetch from SNOW concurrently
+MAX_WORKERS = int(os.getenv('MAX_WORKERS', 4))
 
 # PRTG
 PRTG_BASE_URL = os.environ['PRTG_URL']
@@ -120,7 +125,7 @@ def custom_prtg_parameters(
         else:
             raise HTTPException(status.HTTP_400_BAD_REQUEST, 'Different PRTG instance entered but missing credentials. Choose one of: (1) Token, (2) Username \
                                 and password, (3) Username and passhash')
-        logger.info(f'Using custom PRTG instance {prtg_url}.')
+        logger.info('Using custom PRTG instance {}.', prtg_url)
         return PrtgClient(prtg_url, new_prtg_auth, requests_verify=prtg_verify)
     # use default PRTG instance
     return PrtgClient(PRTG_BASE_URL, prtg_auth, requests_verify=PRTG_VERIFY)
@@ -129,7 +134,16 @@ def custom_prtg_parameters(
 logger.info('Starting up XSAutomate API...')
 desc = f'Defaults to the "{PRTG_BASE_URL.split("://")[1]}" instance. In order to use a different PRTG instance, enter the URL and credential parameters before\
       executing an endpoint. To authenticate for a different PRTG instance, enter one of: (1) token, (2) username and password, or (3) username and passhash.'
-app = FastAPI(title='Reconcile Snow & PRTG', description=desc)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # close pooled connections on shutdown
+    snow_client.close()
+    if email_client is not None:
+        email_client.close()
+
+app = FastAPI(title='Reconcile Snow & PRTG', description=desc, lifespan=lifespan)
 
 @logger.catch
 @app.post('/syncSite', dependencies=[Depends(authorize)], status_code=status.HTTP_202_ACCEPTED)
@@ -142,8 +156,8 @@ def sync_site(background_tasks: BackgroundTasks,
         email: str | None = Form(None, description='Sends result to email address.'),
         prtg_client: PrtgClient = Depends(custom_prtg_parameters),
         request_id: str | None = Form(None, description='Optional ID to return as response.')):
-    logger.info(f'Syncing for {company_name} at {site_name}...')
-    logger.debug(f'Company name: {company_name}, Site name: {site_name}, Root ID: {root_id}, Is Root Site: {root_is_site}')
+    logger.info('Syncing for {} at {}...', company_name, site_name)
+    logger.debug('Company name: {}, Site name: {}, Root ID: {}, Is Root Site: {}', company_name, site_name, root_id, root_is_site)
     # clean str inputs
     company_name = html.escape(company_name, quote=False)
     site_name = html.escape(site_name, quote=False)
@@ -157,8 +171,8 @@ def sync_all_sites(company_name: str = Form(..., description='Name of Company'),
         delete: bool = Form(False, description='If true, delete inactive devices. Defaults to false.'),
         email: str | None = Form(None, description='Sends result to email address.'),
         prtg_client: PrtgClient = Depends(custom_prtg_parameters)):
-    logger.info(f'Syncing all sites for {company_name}...')
-    logger.debug(f'Company name: {company_name}, Root ID: {root_id}')
+    logger.info('Syncing all sites for {}...', company_name)
+    logger.debug('Company name: {}, Root ID: {}', company_name, root_id)
     # clean str input
     company_name = html.escape(company_name, quote=False)
     try:
@@ -166,9 +180,9 @@ def sync_all_sites(company_name: str = Form(..., description='Name of Company'),
             company = snow_controller.get_company_by_name(company_name)
         except (NoResults, MultipleResults) as e:
             raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e) + f' for company {company_name}')
-        logger.info(f'Company "{company_name} found in SNOW."')
+        logger.info('Company "{} found in SNOW."', company_name)
         locations = snow_controller.get_company_locations(company.name)
-        logger.info(f'{len(locations)} locations found in SNOW.')
+        logger.info('{} locations found in SNOW.', len(locations))
 
         prtg_controller = PrtgController(prtg_client)
         # Get current tree
@@ -179,18 +193,23 @@ def sync_all_sites(company_name: str = Form(..., description='Name of Company'),
                 group = prtg_controller.get_group(root_id)
             except ObjectNotFound as e:
                 raise HTTPException(status.HTTP_404_NOT_FOUND, str(e))
-        logger.info(f'Group with ID {root_id} found in PRTG.')
+        logger.info('Group with ID {} found in PRTG.', root_id)
         current_tree = prtg_controller.get_tree(group)
 
+        # Get expected trees concurrently since each site is bound by SNOW requests
+        executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        try:
+            expected_trees = list(executor.map(partial(get_expected_tree, company), locations))
+        except ValueError as e:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+        finally:
+            # don't fetch remaining sites if one of them failed
+            executor.shutdown(cancel_futures=True)
+
         devices_added = []
         devices_deleted = []
-        for location in locations:
-            config_items = snow_controller.get_config_items(company, location)
-            try:
-                expected_tree = get_prtg_tree_adapter(company, location, config_items, snow_controller, False, MIN_DEVICES)
-            except ValueError as e:
-                raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
-
+        # Sync sequentially since all sites modify the same PRTG tree
+        for expected_tree in expected_trees:
             # Sync trees
             try:
                 curr_added, curr_deleted = sync.sync_trees(expected_tree, current_tree, snow_controller, prtg_controller, delete=delete)
@@ -243,7 +262,7 @@ def sync_all_sites(company_name: str = Form(..., description='Name of Company'),
                     raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR,
                                         'Sync has successfully completed but an unexpected error occurred when sending the email.')
             logger.info('Successfully sent report to email.')
-        logger.info(f'Successfully added {len(devices_added)} and deleted {len(devices_deleted)} devices to {company_name}.')
+        logger.info('Successfully added {} and deleted {} devices to {}.', len(devices_added), len(devices_deleted), company_name)
     except (HTTPException, HTTPError) as e:
         # Reraise already handled exception
         logger.error(e)
@@ -266,6 +285,11 @@ def log_error_console_and_snow(request_id: str, error_msg: str):
         error_log = Log(request_id, State.FAILED, error_msg)
         snow_controller.post_log(error_log)
 
+def get_expected_tree(company, location, root_is_site=False):
+    """Get the expected PRTG tree of a company site from SNOW"""
+    config_items = snow_controller.get_config_items(company, location)
+    return get_prtg_tree_adapter(company, location, config_items, snow_controller, root_is_site, MIN_DEVICES)
+
 def sync_site_and_email_task(company_name, site_name, root_id, root_is_site, delete, email, prtg_client, request_id):
     """to be ran using FastAPI's BackgroundTasks"""
     # global try to log unhandled exceptions
@@ -276,16 +300,15 @@ def sync_site_and_email_task(company_name, site_name, root_id, root_is_site, del
         except (NoResults, MultipleResults) as e:
             log_error_console_and_snow(request_id, str(e) + f' for company {company_name}')
             return  # simply return since it's a background task
-        logger.info(f'Company "{company_name} found in SNOW."')
+        logger.info('Company "{} found in SNOW."', company_name)
         try:
             location = snow_controller.get_location_by_name(site_name)
         except (NoResults, MultipleResults) as e:
             log_error_console_and_snow(request_id, str(e) + f' for location {site_name}')
             return
-        logger.info(f'Location "{site_name}" found in SNOW.')
-        config_items = snow_controller.get_config_items(company, location)
+        logger.info('Location "{}" found in SNOW.', site_name)
         try:
-            expected_tree = get_prtg_tree_adapter(company, location, config_items, snow_controller, root_is_site, MIN_DEVICES)
+            expected_tree = get_expected_tree(company, location, root_is_site)
         except ValueError as e:
             log_error_console_and_snow(request_id, str(e))
             return
@@ -300,7 +323,7 @@ def sync_site_and_email_task(company_name, site_name, root_id, root_is_site, del
             except ObjectNotFound as e:
                 log_error_console_and_snow(request_id, str(e))
                 return
-        logger.info(f'Group with ID {root_id} found in PRTG.')
+        logger.info('Group with ID {} found in PRTG.', root_id)
         if group.name != expected_tree.prtg_obj.name:
             log_error_console_and_snow(request_id, f'Root ID {root_id} returns object named "{group.name}" but does not match expected name "{expected_tree.prtg_obj.name}".')
             return
@@ -361,7 +384,7 @@ def sync_site_and_email_task(company_name, site_name, root_id, root_is_site, del
                         snow_controller.post_log(success_except_email_log)
                     return
             logger.info('Successfully sent report to email.')
-        logger.info(f'Successfully added {len(devices_added)} and deleted {len(devices_deleted)} devices to {company_name} at {site_name}.')
+        logger.info('Successfully added {} and deleted {} devices to {} at {}.', len(devices_added), len(devices_deleted), company_name, site_name)
     except Exception as e:
         # Catch all other unhandled exceptions
         log_error_console_and_snow(request_id, 'Unhandled error: ' + str(e))
@@ -375,8 +398,8 @@ def sync_device_task(device_body):
     auth = BasicToken(device_body.prtg_api_key)
     client = PrtgClient(device_body.prtg_url, auth)
     prtg_controller = PrtgController(client)
-    logger.debug(f'PRTG URL: {device_body.prtg_url}')
-    logger.debug(f'Device ID from payload: {device_body.device_id}.')
+    logger.debug('PRTG URL: {}', device_body.prtg_url)
+    logger.debug('Device ID from payload: {}.', device_body.device_id)
     ci = snow_controller.get_config_item(device_body.device_id)
 
     if ci.company is None or ci.location is None:
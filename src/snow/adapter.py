@@ -19,6 +19,12 @@ FORMAT_MAP = {
     'label + ip': '{manufacturer.name} {model_number} {label} ({ip_address})'
 }
 
+# map uppercase manufacturer names to icons, built once instead of an Enum
+# lookup per configuration item
+ICON_MAP = dict(Icon.__members__)
+# Multiple VMware names
+ICON_MAP['VMWARE, INC.'] = Icon.VMWARE
+
 def _check_required_fields(ci: ConfigItem, name_format: str):
     # collect missing fields
     missing_fields = []
@@ -45,7 +51,7 @@ class PrtgDeviceAdapter(Device):
             # check for required attributes
             missing_fields = _check_required_fields(ci, name_format)
             if missing_fields:
-                logger.warning(f'Missing required fields for name format: {", ".join(missing_fields)} for {ci.name}. Falling back to "{cls.default_name_format_key}" name format.')
+                logger.warning('Missing required fields for name format: {} for {}. Falling back to "{}" name format.', ', '.join(missing_fields), ci.name, cls.default_name_format_key)
                 name_format = FORMAT_MAP[cls.default_name_format_key]
             # pass shallow copy of ci to work with dotted attribute format, e.g., manufacturer.name
             name = name_format.format_map({field.name: getattr(ci, field.name) for field in fields(ci)})
@@ -60,14 +66,8 @@ class PrtgDeviceAdapter(Device):
         tags = {ci.stage, ci.category}
 
         icon = None  # default to None
-        try:
-            icon = Icon[ci.manufacturer.name.upper()]
-        except KeyError:
-            # Multiple VMware names
-            if ci.manufacturer.name == 'VMware, Inc.':
-                icon = Icon.VMWARE
-        except AttributeError:
-            pass  # None or other type
+        if ci.manufacturer is not None and ci.manufacturer.name:
+            icon = ICON_MAP.get(ci.manufacturer.name.upper())
         return cls(ci.prtg_id, name, str(ci.ip_address), ci.link, 3, tags, '', icon, Status.UP, True, ci)
 
 
@@ -1,7 +1,13 @@
+import threading
+import time
+from collections import defaultdict
+
 import pysnow
 import requests
 from loguru import logger
 from pysnow.exceptions import NoResults
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 def get_active_ci_query() -> pysnow.QueryBuilder:
@@ -21,12 +27,37 @@ def get_active_ci_query() -> pysnow.QueryBuilder:
 
 
 class ApiClient:
-    def __init__(self, instance, username, password, ssl=True):
+    def __init__(self, instance, username, password, ssl=True, record_ttl=86400):
         self.instance = instance
         self.ssl = ssl
         self._username = username
         self._password = password
         self.client = pysnow.Client(instance=instance, user=username, password=password, use_ssl=ssl)
+        protocol = 'https' if ssl else 'http'
+        self.base_url = f'{protocol}://{instance}.service-now.com'
+        self._log_url = f'{self.base_url}/api/fuss2/prtg_outbound/log'
+        # reuse one session for direct record lookups instead of opening a new
+        # connection per call, and retry on rate limiting or transient errors
+        self.session = requests.Session()
+        self.session.auth = (username, password)
+        # return the last response once retries are exhausted so raise_for_status()
+        # raises HTTPError instead of urllib3 raising RetryError
+        retry = Retry(total=5, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(['GET']), respect_retry_after_header=True, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # {link: (expiration, record)} for records that rarely change
+        self.record_ttl = record_ttl
+        self._record_cache = {}
+        # {link: lock} so concurrent misses on the same link fetch it only once
+        self._record_locks = {}
+        self._record_locks_lock = threading.Lock()
+
+    def close(self):
+        '''Close the pooled sessions of this client and the pysnow client'''
+        self.session.close()
+        self.client.session.close()
 
     def get_u_category_labels(self):
         '''Returns a list of all device categories'''
@@ -172,14 +203,53 @@ class ApiClient:
         return response.all()
 
     def get_record(self, link):
-        with requests.Session() as s:
-            s.auth = (self._username, self._password)
-            response = s.get(link)
+        response = self.session.get(link, timeout=(3.05, 30))
+        response.raise_for_status()
         return response.json()
 
+    def get_cached_record(self, link):
+        '''Same as get_record() but reuses the response for record_ttl seconds.
+        Only use for records that rarely change, e.g. countries or manufacturers.
+        Safe to call from multiple threads.'''
+        record = self._get_unexpired_record(link)
+        if record is not None:
+            return record
+        with self._record_locks_lock:
+            lock = self._record_locks.setdefault(link, threading.Lock())
+        with lock:
+            # another thread may have fetched the record while waiting for the lock
+            record = self._get_unexpired_record(link)
+            if record is None:
+                record = self.get_record(link)
+                self._record_cache[link] = (time.monotonic() + self.record_ttl, record)
+        return record
+
+    def _get_unexpired_record(self, link):
+        try:
+            expiration, record = self._record_cache[link]
+        except KeyError:
+            return None
+        return record if time.monotonic() < expiration else None
+
+    def get_records(self, links):
+        '''Return records by their links, mapped by link. Records from the same
+        table are fetched in a single query.'''
+        # group sys_ids by table, i.e. .../api/now/table/<table>/<sys_id>
+        tables = defaultdict(dict)
+        for link in links:
+            table, sys_id = link.rsplit('/', 2)[-2:]
+            tables[table][sys_id] = link
+        records = {}
+        for table, sys_ids in tables.items():
+            resource = self.client.resource(api_path=f'/table/{table}')
+            query = pysnow.QueryBuilder().field('sys_id').equals(list(sys_ids))
+            response = resource.get(query=query)
+            for record in response.all():
+                records[sys_ids[record['sys_id']]] = record
+        return records
+
     def ci_url(self, sys_id):
-        protocol = 'https' if self.ssl else 'http'
-        return f'{protocol}://{self.instance}.service-now.com/cmdb_ci?sys_id={sys_id}'
+        return f'{self.base_url}/cmdb_ci?sys_id={sys_id}'
 
     def update_prtg_id(self, sys_id, value):
         update = {'u_prtg_id': value}
@@ -204,20 +274,17 @@ class ApiClient:
         return int(response.one()['stats']['count'])
 
     def post_log(self, request_id, state, response_msg):
-        protocol = 'https' if self.ssl else 'http'
-        url = f'{protocol}://{self.instance}.service-now.com/api/fuss2/prtg_outbound/log'
-        auth = (self._username, self._password)
         body = {
             'request_id': request_id,
             'state': state,
             'response_msg': response_msg
         }
-        response = requests.post(url, json=body, auth=auth)
+        response = self.session.post(self._log_url, json=body, timeout=(3.05, 30))
         try:
             response.raise_for_status()
         except requests.HTTPError as e:
             # log unhandled errors and reraise
             logger.error(e)
-            logger.error(f'Response text: {response.text}')
+            logger.error('Response text: {}', response.text)
             raise e
         return response.json()
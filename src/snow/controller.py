@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from ipaddress import AddressValueError, IPv4Address
 
 import requests
@@ -7,8 +9,9 @@ from .models import Company, ConfigItem, Country, Location, Log, Manufacturer
 
 
 class SnowController:
-    def __init__(self, client):
+    def __init__(self, client, max_workers: int = 8):
         self.client = client
+        self.max_workers = max_workers
 
     def _get_company(self, company: dict) -> Company:
         return Company(company['sys_id'], company['name'].strip(), company['u_abbreviated_name'], company['u_prtg_format'].lower())
@@ -17,13 +20,17 @@ class SnowController:
         company = self.client.get_company(name)
         return self._get_company(company)
 
-    def _get_location(self, location: dict):
+    def _get_location(self, location: dict, countries: dict[str, Country] | None = None):
         try:
-            response = self.client.get_record(location['u_country']['link'])
+            link = location['u_country']['link']
         except TypeError:
             country = None
         else:
-            country = Country(response['result']['sys_id'], response['result']['name'])
+            if countries is not None and link in countries:
+                country = countries[link]
+            else:
+                response = self.client.get_cached_record(link)
+                country = Country(response['result']['sys_id'], response['result']['name'])
         street = location['street'].replace('\r\n', ' ')
         return Location(location['sys_id'], location['name'].strip(), country, street, location['city'], location['state'])
 
@@ -33,7 +40,10 @@ class SnowController:
 
     def get_company_locations(self, company_name: str) -> list[Location]:
         locations = self.client.get_company_locations(company_name)
-        return [self._get_location(location) for location in locations]
+        # look up all countries in one request instead of one per location
+        links = {location['u_country']['link'] for location in locations if location['u_country']}
+        countries = {link: Country(record['sys_id'], record['name']) for link, record in self.client.get_records(links).items()}
+        return [self._get_location(location, countries) for location in locations]
 
     def _get_config_item(self, ci: dict, company: Company | None = None, location: Location | None = None):
         try:
@@ -44,7 +54,7 @@ class SnowController:
         hostname = ci['u_host_name']
 
         try:
-            response = self.client.get_record(ci['manufacturer']['link'])
+            response = self.client.get_cached_record(ci['manufacturer']['link'])
         except TypeError:
             manufacturer = None
         else:
@@ -96,7 +106,9 @@ class SnowController:
 
     def get_config_items(self, company: Company, location: Location) -> list[ConfigItem]:
         cis = self.client.get_cis_by_site(company.name, location.name)
-        return [self._get_config_item(ci, company, location) for ci in cis]
+        # each config item looks up its manufacturer record, so fetch them concurrently
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(partial(self._get_config_item, company=company, location=location), cis))
 
     def update_config_item(self, ci: ConfigItem):
         # Currently only updates prtg_id field
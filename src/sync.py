@@ -34,10 +34,12 @@ def sync_trees(expected: Node,
 
     # sync all devices, counting new devices added
     devices_added = []
-    current_devices_ids = {node.prtg_obj.id for node in current_devices}
+    # reuse current device details to avoid fetching them again when updating
+    current_devices_map = {node.prtg_obj.id: node.prtg_obj for node in current_devices}
     for node in expected_devices:
-        device = sync_device(node.path, current_controller, expected_controller, root_group=current.prtg_obj)
-        if node.prtg_obj.id is None or node.prtg_obj.id not in current_devices_ids:
+        device = sync_device(node.path, current_controller, expected_controller, root_group=current.prtg_obj,
+                             current_device=current_devices_map.get(node.prtg_obj.id))
+        if node.prtg_obj.id is None or node.prtg_obj.id not in current_devices_map:
             devices_added.append(device)
         node.prtg_obj.id = device.id  # update ID before deleting inactive devices
 
@@ -51,23 +53,22 @@ def sync_trees(expected: Node,
             continue
         devices_deleted.append(node.prtg_obj)
         current_parent = current_controller.get_parent(node.prtg_obj)
-        logger.info(f'Device {node.prtg_obj.name} is no longer considered active. Deleting device...')
+        logger.info('Device {} is no longer considered active. Deleting device...', node.prtg_obj.name)
         current_controller.delete_object(node.prtg_obj)
 
         # remove empty parent group(s), if any
         while True:
-            groups = current_controller.get_groups(current_parent)
-            devices = current_controller.get_devices(current_parent)
-            if groups or devices or current_parent.id == current.prtg_obj.id:
+            if current_parent.id == current.prtg_obj.id or not current_controller.is_empty(current_parent):
                 break
-            logger.info(f'Previous group is empty. Deleteing group {current_parent.name}...')
+            logger.info('Previous group is empty. Deleteing group {}...', current_parent.name)
             ancestor = current_controller.get_parent(current_parent)
             current_controller.delete_object(current_parent)
             current_parent = ancestor
     return devices_added, devices_deleted
 
 
-def sync_device(expected_path: tuple[Node], current_controller: PrtgController, expected_controller: SnowController, root_group = None) -> Device:
+def sync_device(expected_path: tuple[Node], current_controller: PrtgController, expected_controller: SnowController, root_group = None,
+                current_device: Device | None = None) -> Device:
     """Synchronize a given device: (1) create groups, if necessary, (2) update device details, (3) move device if necessary, 
     and (4) remove last group if empty. If device does not exist, simply create device and any intermediate groups if necessary.
 
@@ -75,6 +76,8 @@ def sync_device(expected_path: tuple[Node], current_controller: PrtgController,
         expected (tuple[Node]): tuple of nodes representing path to device and its updated details
         current_controller (PrtgController): controller to interact with platform to sync
         expected_controller (SnowController): controller to update device ID field, only needed if not already created
+        root_group (Group, optional): existing root group, skips querying root if passed
+        current_device (Device, optional): current state of device, skips fetching it before updating if passed
 
     Raises:
         ValueError: root group cannot be found
@@ -124,7 +127,7 @@ def sync_device(expected_path: tuple[Node], current_controller: PrtgController,
     # create intermediate groups, if any
     # replace existing_group variable for when moving device
     for group in groups_to_create:
-        logger.info(f'Adding missing, intermediate group {group.name} to {existing_group.name}...')
+        logger.info('Adding missing, intermediate group {} to {}...', group.name, existing_group.name)
         new_group = current_controller.add_group(group, existing_group)
         existing_group = new_group
 
@@ -133,33 +136,31 @@ def sync_device(expected_path: tuple[Node], current_controller: PrtgController,
         try:
             current_parent = current_controller.get_parent(expected_device)
         except ObjectNotFound:
-            logger.info(f'Cannot find device {expected_device.ci.name} with ID {expected_device.id}. Removing ID...')
+            logger.info('Cannot find device {} with ID {}. Removing ID...', expected_device.ci.name, expected_device.id)
             expected_device.id = None
 
     # simply create device if it does not exist or if ID mismatch
     if expected_device.id is None:
-        logger.info(f'ID not found for device {expected_device.name}. Creating new device {expected_device.name}...')
+        logger.info('ID not found for device {}. Creating new device {}...', expected_device.name, expected_device.name)
         new_device = current_controller.add_device(expected_device, existing_group)
         expected_device.ci.prtg_id = new_device.id
         expected_controller.update_config_item(expected_device.ci)
         return new_device
 
     # (2) update device details
-    logger.info(f'Updating {expected_device.name} details...')
-    current_controller.update_device(expected_device)
+    logger.info('Updating {} details...', expected_device.name)
+    current_controller.update_device(expected_device, current_device)
 
     # (3) move device if necessary
     if current_parent.id != existing_group.id:
-        logger.info(f'Device {expected_device.name} is in incorrect group. Moving to {existing_group.name}...')
+        logger.info('Device {} is in incorrect group. Moving to {}...', expected_device.name, existing_group.name)
         current_controller.move_object(expected_device, existing_group)
 
         # (4) remove parent group(s) if empty
         while True:
-            groups = current_controller.get_groups(current_parent)
-            devices = current_controller.get_devices(current_parent)
-            if groups or devices or current_parent.id == root.id:
+            if current_parent.id == root.id or not current_controller.is_empty(current_parent):
                 break
-            logger.info(f'Previous group is empty. Deleteing group {current_parent.name}...')
+            logger.info('Previous group is empty. Deleteing group {}...', current_parent.name)
             ancestor = current_controller.get_parent(current_parent)
             current_controller.delete_object(current_parent)
             current_parent = ancestor
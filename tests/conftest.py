@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# modules in src/ are imported as top-level packages, e.g. `from snow import ApiClient`
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
@@ -0,0 +1,47 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+requests = pytest.importorskip('requests')
+pytest.importorskip('pysnow')
+
+from snow import ApiClient  # noqa: E402
+
+
+class UnavailableHandler(BaseHTTPRequestHandler):
+    """Always responds with 503 Service Unavailable"""
+    hits = 0
+
+    def do_GET(self):
+        UnavailableHandler.hits += 1
+        self.send_response(503)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def unavailable_server():
+    UnavailableHandler.hits = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), UnavailableHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_record_raises_http_error_after_retries(unavailable_server):
+    client = ApiClient('myservicenow', 'admin', 'mypassword', ssl=False)
+    adapter = client.session.get_adapter(unavailable_server)
+    # keep retries but skip waiting between them
+    adapter.max_retries = adapter.max_retries.new(backoff_factor=0)
+
+    with pytest.raises(requests.HTTPError) as exc_info:
+        client.get_record(f'{unavailable_server}/api/now/table/cmdb_ci/123')
+
+    assert exc_info.value.response.status_code == 503
+    assert UnavailableHandler.hits == adapter.max_retries.total + 1